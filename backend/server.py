@@ -1,16 +1,22 @@
-from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException, Query
+from fastapi import FastAPI, APIRouter, Depends, File, UploadFile, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.collation import Collation
 import os
 import logging
+import asyncio
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 import uuid
-from datetime import datetime
-import shutil
+import time
+from datetime import datetime, timezone
+import aiofiles
+import orjson
 import re
 
 
@@ -21,13 +27,20 @@ load_dotenv(ROOT_DIR / '.env')
 uploads_dir = ROOT_DIR / "uploads"
 uploads_dir.mkdir(exist_ok=True)
 
-# MongoDB connection
+# MongoDB connection (the client is created on startup, in the server's event loop)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+db_name = os.environ['DB_NAME']
+
+def get_db(request: Request) -> AsyncIOMotorDatabase:
+    return request.app.state.db
+
+class UTCJSONResponse(ORJSONResponse):
+    """ORJSONResponse writing UTC datetimes with a Z suffix, like Pydantic does"""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(default_response_class=UTCJSONResponse)
 
 # Mount static files for image serving
 app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
@@ -35,6 +48,48 @@ app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Text search relevance, used both as projection and sort key
+TEXT_SCORE = {"score": {"$meta": "textScore"}}
+
+# Case-insensitive collation shared by the filter indexes and their queries
+CI_COLLATION = Collation(locale="fr", strength=2)
+
+# Keys stored or projected by MongoDB that are not part of the API payload
+INTERNAL_KEYS = ("_id", "score")
+
+def public_docs(docs: List[dict]) -> List[dict]:
+    """Strip internal keys from raw documents returned as-is to clients"""
+    return [{k: v for k, v in doc.items() if k not in INTERNAL_KEYS} for doc in docs]
+
+def dump_public(doc: dict) -> bytes:
+    """orjson-encode a raw document without its internal keys"""
+    for key in INTERNAL_KEYS:
+        doc.pop(key, None)
+    return orjson.dumps(doc, option=orjson.OPT_UTC_Z)
+
+async def stream_docs(first: Optional[dict], cursor) -> AsyncIterator[bytes]:
+    """Serialize first and the rest of cursor into a JSON array batch by batch"""
+    yield b"["
+    if first is not None:
+        yield dump_public(first)
+        async for doc in cursor:
+            yield b"," + dump_public(doc)
+    yield b"]"
+
+async def stream_response(cursor) -> StreamingResponse:
+    """Stream a cursor as a JSON array response"""
+    # Run the query before the 200 goes out, so its errors still become HTTP errors
+    try:
+        first = await cursor.next()
+    except StopAsyncIteration:
+        first = None
+    return StreamingResponse(stream_docs(first, cursor), media_type="application/json")
+
+def prefix_match(value: str) -> dict:
+    """Case-insensitive prefix filter, resolved as an index range under CI_COLLATION"""
+    # U+FFFF sorts after every other character in ICU collations
+    return {"$gte": value, "$lt": value + "\uffff"}
+
 # Define Models
 class Actor(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -44,7 +99,7 @@ class Actor(BaseModel):
     biographie: Optional[str] = None
     photo_profil: Optional[str] = None
     filmographie: List[str] = Field(default_factory=list)  # List of movie IDs
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ActorCreate(BaseModel):
     nom: str
@@ -62,7 +117,7 @@ class Movie(BaseModel):
     photo_couverture: Optional[str] = None
     acteurs: List[str] = Field(default_factory=list)  # List of actor IDs
     lien_externe: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class MovieCreate(BaseModel):
     nom: str
@@ -72,31 +127,119 @@ class MovieCreate(BaseModel):
     acteurs: List[str] = Field(default_factory=list)
     lien_externe: Optional[str] = None
 
+# distinct() results for /genres and /nationalities, reset by writes
+DISTINCT_CACHE_TTL = 60.0  # seconds
+_genre_cache = {"v": None, "t": float("-inf"), "gen": 0}
+_nationality_cache = {"v": None, "t": float("-inf"), "gen": 0}
+
+def invalidate_distinct(cache: dict) -> None:
+    """Expire a distinct() cache and discard any refresh already in flight"""
+    cache["t"] = float("-inf")
+    cache["gen"] += 1
+
+async def cached_distinct(cache: dict, collection, field: str) -> list:
+    """Non-empty distinct values of field, served from cache for DISTINCT_CACHE_TTL"""
+    if time.monotonic() - cache["t"] < DISTINCT_CACHE_TTL:
+        return cache["v"]
+    gen, started = cache["gen"], time.monotonic()
+    values = [v for v in await collection.distinct(field) if v]
+    # A write during the await makes this snapshot stale: return it, don't keep it
+    if cache["gen"] == gen:
+        cache["v"], cache["t"] = values, started
+    return values
+
+# Image extensions accepted by the photo upload endpoints
+ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "webp", "gif"}
+
+# Uploads are streamed to disk in fixed-size chunks, unless small enough
+# to be written in one go
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+SMALL_UPLOAD_SIZE = 4 << 20  # 4 MiB
+
+# Bounds how many uploads are copied to disk at the same time
+_UPLOAD_SEM = asyncio.Semaphore(int(os.getenv("MAX_CONCURRENT_UPLOADS", "8")))
+
+def disk_fileno(file) -> Optional[int]:
+    """Return the descriptor of an upload spooled to disk, None if it is held in memory"""
+    # Asking a SpooledTemporaryFile for fileno() would force it to disk
+    if not hasattr(os, "sendfile") or not getattr(file, "_rolled", True):
+        return None
+    try:
+        return file.fileno()
+    except (AttributeError, OSError):
+        return None
+
+def sendfile_copy(src_fd: int, offset: int, destination: Path) -> None:
+    """Copy src_fd from offset to destination in-kernel with sendfile(2)"""
+    remaining = os.fstat(src_fd).st_size - offset
+    dst_fd = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while remaining > 0:
+            sent = os.sendfile(dst_fd, src_fd, offset, remaining)
+            if sent == 0:
+                break
+            offset += sent
+            remaining -= sent
+    finally:
+        os.close(dst_fd)
+
+async def sendfile_upload(upload_file: UploadFile, destination: Path) -> bool:
+    """Copy a disk-spooled upload with sendfile(2), False if the caller must copy it instead"""
+    src_fd = disk_fileno(upload_file.file)
+    if src_fd is None:
+        return False
+    offset = upload_file.file.tell()
+    try:
+        # Zero-copy transfer off the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, sendfile_copy, src_fd, offset, destination
+        )
+        return True
+    except OSError:
+        # File-to-file sendfile is not supported everywhere (ENOTSOCK on macOS,
+        # EINVAL on some filesystems): rewind and let the caller copy it
+        await upload_file.seek(offset)
+        return False
+
 # Helper function to save uploaded file
 async def save_upload_file(upload_file: UploadFile, destination: Path) -> str:
     try:
-        with destination.open("wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+        async with _UPLOAD_SEM:
+            if await sendfile_upload(upload_file, destination):
+                return str(destination.name)
+            if upload_file.size is not None and upload_file.size < SMALL_UPLOAD_SIZE:
+                # Typical photo: one read, then a single open/write/close off the loop
+                data = await upload_file.read()
+                await asyncio.get_running_loop().run_in_executor(
+                    None, destination.write_bytes, data
+                )
+            else:
+                async with aiofiles.open(destination, "wb") as buffer:
+                    while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+                        await buffer.write(chunk)
         return str(destination.name)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
 
 # Actor endpoints
 @api_router.post("/actors", response_model=Actor)
-async def create_actor(actor_data: ActorCreate):
-    actor_dict = actor_data.dict()
-    actor = Actor(**actor_dict)
-    await db.actors.insert_one(actor.dict())
+async def create_actor(actor_data: ActorCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
+    actor = Actor.model_construct(**actor_data.model_dump())
+    await db.actors.insert_one(actor.model_dump())
+    invalidate_distinct(_nationality_cache)
     return actor
 
 @api_router.post("/actors/{actor_id}/photo")
-async def upload_actor_photo(actor_id: str, file: UploadFile = File(...)):
+async def upload_actor_photo(actor_id: str, file: UploadFile = File(...), db: AsyncIOMotorDatabase = Depends(get_db)):
     # Validate file type
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
     
+    file_extension = Path(file.filename or "").suffix.lstrip(".").lower()
+    if file_extension not in ALLOWED_IMAGE_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    
     # Create unique filename
-    file_extension = file.filename.split('.')[-1]
     filename = f"actor_{actor_id}_{uuid.uuid4().hex[:8]}.{file_extension}"
     file_path = uploads_dir / filename
     
@@ -112,31 +255,27 @@ async def upload_actor_photo(actor_id: str, file: UploadFile = File(...)):
     
     return {"photo_url": photo_url}
 
-@api_router.get("/actors", response_model=List[Actor])
+@api_router.get("/actors")
 async def get_actors(
     search: Optional[str] = Query(None, description="Search by name, nationality, or biography"),
     nom: Optional[str] = Query(None, description="Filter by name"),
     nationalite: Optional[str] = Query(None, description="Filter by nationality"),
     age_min: Optional[int] = Query(None, description="Minimum age"),
     age_max: Optional[int] = Query(None, description="Maximum age"),
-    limit: int = Query(50, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     query = {}
     
-    # Search across multiple fields
+    # Search across multiple fields (actors_text index)
     if search:
-        search_regex = {"$regex": search, "$options": "i"}
-        query["$or"] = [
-            {"nom": search_regex},
-            {"nationalite": search_regex},
-            {"biographie": search_regex}
-        ]
+        query["$text"] = {"$search": search}
     
-    # Specific filters
+    # Specific filters (case-insensitive prefix)
     if nom:
-        query["nom"] = {"$regex": nom, "$options": "i"}
+        query["nom"] = prefix_match(nom)
     if nationalite:
-        query["nationalite"] = {"$regex": nationalite, "$options": "i"}
+        query["nationalite"] = prefix_match(nationalite)
     if age_min is not None or age_max is not None:
         age_query = {}
         if age_min is not None:
@@ -145,54 +284,59 @@ async def get_actors(
             age_query["$lte"] = age_max
         query["age"] = age_query
     
-    actors = await db.actors.find(query).limit(limit).to_list(limit)
-    return [Actor(**actor) for actor in actors]
+    cursor = db.actors.find(query, TEXT_SCORE if search else None, collation=CI_COLLATION)
+    if search:
+        cursor = cursor.sort(list(TEXT_SCORE.items()))
+    return await stream_response(cursor.limit(limit))
 
 @api_router.get("/actors/{actor_id}", response_model=Actor)
-async def get_actor(actor_id: str):
+async def get_actor(actor_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     actor = await db.actors.find_one({"id": actor_id})
     if not actor:
         raise HTTPException(status_code=404, detail="Actor not found")
-    return Actor(**actor)
+    return Actor.model_construct(**actor)
 
 @api_router.put("/actors/{actor_id}", response_model=Actor)
-async def update_actor(actor_id: str, actor_update: ActorCreate):
-    # Check if actor exists
-    existing = await db.actors.find_one({"id": actor_id})
-    if not existing:
+async def update_actor(actor_id: str, actor_update: ActorCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
+    # Update actor and fetch the result in a single round-trip
+    update_data = actor_update.model_dump(exclude_none=True)
+    updated = await db.actors.find_one_and_update(
+        {"id": actor_id},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    if updated is None:
         raise HTTPException(status_code=404, detail="Actor not found")
-    
-    # Update actor
-    update_data = {k: v for k, v in actor_update.dict().items() if v is not None}
-    await db.actors.update_one({"id": actor_id}, {"$set": update_data})
-    
-    # Return updated actor
-    updated = await db.actors.find_one({"id": actor_id})
-    return Actor(**updated)
+    invalidate_distinct(_nationality_cache)
+    return Actor.model_construct(**updated)
 
 @api_router.delete("/actors/{actor_id}")
-async def delete_actor(actor_id: str):
+async def delete_actor(actor_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     result = await db.actors.delete_one({"id": actor_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Actor not found")
+    invalidate_distinct(_nationality_cache)
     return {"message": "Actor deleted successfully"}
 
 # Movie endpoints
 @api_router.post("/movies", response_model=Movie)
-async def create_movie(movie_data: MovieCreate):
-    movie_dict = movie_data.dict()
-    movie = Movie(**movie_dict)
-    await db.movies.insert_one(movie.dict())
+async def create_movie(movie_data: MovieCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
+    movie = Movie.model_construct(**movie_data.model_dump())
+    await db.movies.insert_one(movie.model_dump())
+    invalidate_distinct(_genre_cache)
     return movie
 
 @api_router.post("/movies/{movie_id}/photo")
-async def upload_movie_photo(movie_id: str, file: UploadFile = File(...)):
+async def upload_movie_photo(movie_id: str, file: UploadFile = File(...), db: AsyncIOMotorDatabase = Depends(get_db)):
     # Validate file type
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
     
+    file_extension = Path(file.filename or "").suffix.lstrip(".").lower()
+    if file_extension not in ALLOWED_IMAGE_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    
     # Create unique filename
-    file_extension = file.filename.split('.')[-1]
     filename = f"movie_{movie_id}_{uuid.uuid4().hex[:8]}.{file_extension}"
     file_path = uploads_dir / filename
     
@@ -208,107 +352,94 @@ async def upload_movie_photo(movie_id: str, file: UploadFile = File(...)):
     
     return {"photo_url": photo_url}
 
-@api_router.get("/movies", response_model=List[Movie])
+@api_router.get("/movies")
 async def get_movies(
     search: Optional[str] = Query(None, description="Search by name, genre, or description"),
     nom: Optional[str] = Query(None, description="Filter by name"),
     genre: Optional[str] = Query(None, description="Filter by genre"),
     annee: Optional[int] = Query(None, description="Filter by year"),
-    limit: int = Query(50, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     query = {}
     
-    # Search across multiple fields
+    # Search across multiple fields (movies_text index)
     if search:
-        search_regex = {"$regex": search, "$options": "i"}
-        query["$or"] = [
-            {"nom": search_regex},
-            {"genre": search_regex},
-            {"description": search_regex}
-        ]
+        query["$text"] = {"$search": search}
     
-    # Specific filters
+    # Specific filters (case-insensitive prefix)
     if nom:
-        query["nom"] = {"$regex": nom, "$options": "i"}
+        query["nom"] = prefix_match(nom)
     if genre:
-        query["genre"] = {"$regex": genre, "$options": "i"}
+        query["genre"] = prefix_match(genre)
     if annee:
         query["annee"] = annee
     
-    movies = await db.movies.find(query).limit(limit).to_list(limit)
-    return [Movie(**movie) for movie in movies]
+    cursor = db.movies.find(query, TEXT_SCORE if search else None, collation=CI_COLLATION)
+    if search:
+        cursor = cursor.sort(list(TEXT_SCORE.items()))
+    elif genre and annee:
+        # Keep the planner on the compound index rather than a single-field one
+        cursor = cursor.hint("genre_annee")
+    return await stream_response(cursor.limit(limit))
 
 @api_router.get("/movies/{movie_id}", response_model=Movie)
-async def get_movie(movie_id: str):
+async def get_movie(movie_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     movie = await db.movies.find_one({"id": movie_id})
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return Movie(**movie)
+    return Movie.model_construct(**movie)
 
 @api_router.put("/movies/{movie_id}", response_model=Movie)
-async def update_movie(movie_id: str, movie_update: MovieCreate):
-    # Check if movie exists
-    existing = await db.movies.find_one({"id": movie_id})
-    if not existing:
+async def update_movie(movie_id: str, movie_update: MovieCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
+    # Update movie and fetch the result in a single round-trip
+    update_data = movie_update.model_dump(exclude_none=True)
+    updated = await db.movies.find_one_and_update(
+        {"id": movie_id},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    if updated is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
-    # Update movie
-    update_data = {k: v for k, v in movie_update.dict().items() if v is not None}
-    await db.movies.update_one({"id": movie_id}, {"$set": update_data})
-    
-    # Return updated movie
-    updated = await db.movies.find_one({"id": movie_id})
-    return Movie(**updated)
+    invalidate_distinct(_genre_cache)
+    return Movie.model_construct(**updated)
 
 @api_router.delete("/movies/{movie_id}")
-async def delete_movie(movie_id: str):
+async def delete_movie(movie_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     result = await db.movies.delete_one({"id": movie_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Movie not found")
+    invalidate_distinct(_genre_cache)
     return {"message": "Movie deleted successfully"}
 
 # Utility endpoints
 @api_router.get("/genres")
-async def get_all_genres():
+async def get_all_genres(db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get all unique genres from movies"""
-    genres = await db.movies.distinct("genre")
-    return {"genres": [g for g in genres if g]}
+    return {"genres": await cached_distinct(_genre_cache, db.movies, "genre")}
 
 @api_router.get("/nationalities")
-async def get_all_nationalities():
+async def get_all_nationalities(db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get all unique nationalities from actors"""
-    nationalities = await db.actors.distinct("nationalite")
-    return {"nationalities": [n for n in nationalities if n]}
+    return {"nationalities": await cached_distinct(_nationality_cache, db.actors, "nationalite")}
 
 # Global search endpoint
 @api_router.get("/search")
-async def global_search(q: str = Query(..., description="Search query")):
-    search_regex = {"$regex": q, "$options": "i"}
+async def global_search(q: str = Query(..., description="Search query"), db: AsyncIOMotorDatabase = Depends(get_db)):
+    text_query = {"$text": {"$search": q}}
+    text_sort = list(TEXT_SCORE.items())
     
-    # Search actors
-    actor_query = {
-        "$or": [
-            {"nom": search_regex},
-            {"nationalite": search_regex},
-            {"biographie": search_regex}
-        ]
-    }
-    actors = await db.actors.find(actor_query).limit(10).to_list(10)
-    
-    # Search movies
-    movie_query = {
-        "$or": [
-            {"nom": search_regex},
-            {"genre": search_regex},
-            {"description": search_regex}
-        ]
-    }
-    movies = await db.movies.find(movie_query).limit(10).to_list(10)
+    # Search actors and movies concurrently
+    actors, movies = await asyncio.gather(
+        db.actors.find(text_query, TEXT_SCORE).sort(text_sort).limit(10).to_list(10),
+        db.movies.find(text_query, TEXT_SCORE).sort(text_sort).limit(10).to_list(10)
+    )
     
-    return {
-        "actors": [Actor(**actor) for actor in actors],
-        "movies": [Movie(**movie) for movie in movies]
-    }
+    # Returned as a response so the aware datetimes skip jsonable_encoder
+    return UTCJSONResponse({
+        "actors": public_docs(actors),
+        "movies": public_docs(movies)
+    })
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -328,6 +459,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def create_indexes(db: AsyncIOMotorDatabase):
+    # Text indexes backing the `search` / `q` parameters
+    await db.actors.create_index(
+        [("nom", "text"), ("nationalite", "text"), ("biographie", "text")],
+        name="actors_text",
+        default_language="french"
+    )
+    await db.movies.create_index(
+        [("nom", "text"), ("genre", "text"), ("description", "text")],
+        name="movies_text",
+        default_language="french"
+    )
+    
+    # Case-insensitive indexes backing the field filters; the compound ones
+    # also serve nationalite-only and genre-only filters through their prefix
+    await db.actors.create_index("nom", name="actors_nom_ci", collation=CI_COLLATION)
+    await db.actors.create_index(
+        [("nationalite", 1), ("age", 1)], name="nat_age", collation=CI_COLLATION
+    )
+    await db.movies.create_index("nom", name="movies_nom_ci", collation=CI_COLLATION)
+    await db.movies.create_index(
+        [("genre", 1), ("annee", 1)], name="genre_annee", collation=CI_COLLATION
+    )
+    
+    # Point lookups by id and range/equality filters
+    await db.actors.create_index("id", unique=True)
+    await db.movies.create_index("id", unique=True)
+    await db.actors.create_index("age")
+    await db.movies.create_index("annee")
+
+@app.on_event("startup")
+async def startup_db_client():
+    app.state.client = AsyncIOMotorClient(
+        mongo_url,
+        maxPoolSize=100,
+        minPoolSize=10,
+        serverSelectionTimeoutMS=2000,
+        tz_aware=True,
+        tzinfo=timezone.utc
+    )
+    app.state.db = app.state.client[db_name]
+    await create_indexes(app.state.db)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    app.state.client.close()
\ No newline at end of file
@@ -1,4 +1,5 @@
-import requests
+import asyncio
+import httpx
 import sys
 import json
 import io
@@ -11,58 +12,66 @@ class CineBaseAPITester:
         self.tests_passed = 0
         self.created_actors = []
         self.created_movies = []
+        self.client = None
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, files=None):
-        """Run a single API test"""
-        url = f"{self.base_url}/{endpoint}"
-        headers = {}
-        if data and not files:
-            headers['Content-Type'] = 'application/json'
+    async def __aenter__(self):
+        # One pooled HTTP/2 client shared by all (possibly concurrent) tests
+        self.client = httpx.AsyncClient(base_url=self.base_url, http2=True, timeout=30.0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
 
+    async def run_test(self, name, method, endpoint, expected_status, data=None, files=None):
+        """Run a single API test"""
         self.tests_run += 1
-        print(f"\n🔍 Testing {name}...")
-        print(f"   URL: {url}")
         
         try:
             if method == 'GET':
-                response = requests.get(url, headers=headers, params=data)
+                response = await self.client.get(endpoint, params=data)
             elif method == 'POST':
                 if files:
-                    response = requests.post(url, data=data, files=files)
+                    response = await self.client.post(endpoint, data=data, files=files)
                 else:
-                    response = requests.post(url, json=data, headers=headers)
+                    response = await self.client.post(endpoint, json=data)
             elif method == 'PUT':
-                response = requests.put(url, json=data, headers=headers)
+                response = await self.client.put(endpoint, json=data)
             elif method == 'DELETE':
-                response = requests.delete(url, headers=headers)
-
-            success = response.status_code == expected_status
-            if success:
-                self.tests_passed += 1
-                print(f"✅ Passed - Status: {response.status_code}")
-                try:
-                    response_data = response.json()
-                    if isinstance(response_data, dict) and 'id' in response_data:
-                        print(f"   Created ID: {response_data['id']}")
-                    return True, response_data
-                except:
-                    return True, {}
-            else:
-                print(f"❌ Failed - Expected {expected_status}, got {response.status_code}")
-                try:
-                    error_detail = response.json()
-                    print(f"   Error: {error_detail}")
-                except:
-                    print(f"   Response: {response.text}")
-                return False, {}
-
+                response = await self.client.delete(endpoint)
         except Exception as e:
+            self._print_header(name, endpoint)
             print(f"❌ Failed - Error: {str(e)}")
             return False, {}
 
-    def test_create_actor(self, actor_data):
+        # Printed once the response is in, so concurrent tests don't interleave
+        self._print_header(name, endpoint)
+        success = response.status_code == expected_status
+        if success:
+            self.tests_passed += 1
+            print(f"✅ Passed - Status: {response.status_code}")
+            try:
+                response_data = response.json()
+                if isinstance(response_data, dict) and 'id' in response_data:
+                    print(f"   Created ID: {response_data['id']}")
+                return True, response_data
+            except:
+                return True, {}
+        else:
+            print(f"❌ Failed - Expected {expected_status}, got {response.status_code}")
+            try:
+                error_detail = response.json()
+                print(f"   Error: {error_detail}")
+            except:
+                print(f"   Response: {response.text}")
+            return False, {}
+
+    def _print_header(self, name, endpoint):
+        print(f"\n🔍 Testing {name}...")
+        print(f"   URL: {self.base_url}/{endpoint}")
+
+    async def test_create_actor(self, actor_data):
         """Test creating an actor"""
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Create Actor - {actor_data['nom']}",
             "POST",
             "actors",
@@ -74,13 +83,13 @@ class CineBaseAPITester:
             return response['id']
         return None
 
-    def test_get_actors(self, params=None):
+    async def test_get_actors(self, params=None):
         """Test getting actors with optional filters"""
         test_name = "Get Actors"
         if params:
             test_name += f" with filters: {params}"
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             test_name,
             "GET",
             "actors",
@@ -91,9 +100,9 @@ class CineBaseAPITester:
             print(f"   Found {len(response)} actors")
         return success, response
 
-    def test_get_actor_by_id(self, actor_id):
+    async def test_get_actor_by_id(self, actor_id):
         """Test getting a specific actor"""
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Get Actor by ID - {actor_id}",
             "GET",
             f"actors/{actor_id}",
@@ -101,9 +110,9 @@ class CineBaseAPITester:
         )
         return success, response
 
-    def test_create_movie(self, movie_data):
+    async def test_create_movie(self, movie_data):
         """Test creating a movie"""
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Create Movie - {movie_data['nom']}",
             "POST",
             "movies",
@@ -115,13 +124,13 @@ class CineBaseAPITester:
             return response['id']
         return None
 
-    def test_get_movies(self, params=None):
+    async def test_get_movies(self, params=None):
         """Test getting movies with optional filters"""
         test_name = "Get Movies"
         if params:
             test_name += f" with filters: {params}"
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             test_name,
             "GET",
             "movies",
@@ -132,9 +141,9 @@ class CineBaseAPITester:
             print(f"   Found {len(response)} movies")
         return success, response
 
-    def test_get_movie_by_id(self, movie_id):
+    async def test_get_movie_by_id(self, movie_id):
         """Test getting a specific movie"""
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Get Movie by ID - {movie_id}",
             "GET",
             f"movies/{movie_id}",
@@ -142,9 +151,9 @@ class CineBaseAPITester:
         )
         return success, response
 
-    def test_global_search(self, query):
+    async def test_global_search(self, query):
         """Test global search functionality"""
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Global Search - '{query}'",
             "GET",
             "search",
@@ -157,9 +166,9 @@ class CineBaseAPITester:
             print(f"   Found {actors_count} actors, {movies_count} movies")
         return success, response
 
-    def test_get_genres(self):
+    async def test_get_genres(self):
         """Test getting all genres"""
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Get All Genres",
             "GET",
             "genres",
@@ -170,9 +179,9 @@ class CineBaseAPITester:
             print(f"   Found {len(genres)} genres: {genres}")
         return success, response
 
-    def test_get_nationalities(self):
+    async def test_get_nationalities(self):
         """Test getting all nationalities"""
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Get All Nationalities",
             "GET",
             "nationalities",
@@ -183,14 +192,14 @@ class CineBaseAPITester:
             print(f"   Found {len(nationalities)} nationalities: {nationalities}")
         return success, response
 
-    def test_file_upload(self, entity_type, entity_id):
+    async def test_file_upload(self, entity_type, entity_id):
         """Test file upload for actor or movie"""
         # Create a simple test image file
         test_image_content = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00\x00\x00\tpHYs\x00\x00\x0b\x13\x00\x00\x0b\x13\x01\x00\x9a\x9c\x18\x00\x00\x00\nIDATx\x9cc\xf8\x00\x00\x00\x01\x00\x01\x00\x00\x00\x00IEND\xaeB`\x82'
         
         files = {'file': ('test.png', io.BytesIO(test_image_content), 'image/png')}
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Upload {entity_type} Photo - {entity_id}",
             "POST",
             f"{entity_type}s/{entity_id}/photo",
@@ -202,7 +211,7 @@ class CineBaseAPITester:
             print(f"   Photo URL: {photo_url}")
         return success, response
 
-def main():
+async def main():
     print("🎬 Starting CinéBase API Testing...")
     print("=" * 50)
     
@@ -238,64 +247,65 @@ def main():
         "description": "Film muet en noir et blanc"
     }
 
-    print("\n📋 PHASE 1: ACTOR CRUD OPERATIONS")
-    print("-" * 40)
-    
-    # Test creating actors
-    actor1_id = tester.test_create_actor(sample_actor)
-    actor2_id = tester.test_create_actor(sample_actor2)
-    
-    # Test getting all actors
-    tester.test_get_actors()
-    
-    # Test getting specific actors
-    if actor1_id:
-        tester.test_get_actor_by_id(actor1_id)
-    
-    # Test actor search and filters
-    tester.test_get_actors({"search": "Marion"})
-    tester.test_get_actors({"nationalite": "Française"})
-    tester.test_get_actors({"age_min": 45, "age_max": 55})
-    
-    print("\n🎬 PHASE 2: MOVIE CRUD OPERATIONS")
-    print("-" * 40)
-    
-    # Test creating movies
-    movie1_id = tester.test_create_movie(sample_movie)
-    movie2_id = tester.test_create_movie(sample_movie2)
-    
-    # Test getting all movies
-    tester.test_get_movies()
-    
-    # Test getting specific movies
-    if movie1_id:
-        tester.test_get_movie_by_id(movie1_id)
-    
-    # Test movie search and filters
-    tester.test_get_movies({"search": "Môme"})
-    tester.test_get_movies({"genre": "Biographie"})
-    tester.test_get_movies({"annee": 2007})
-    
-    print("\n🔍 PHASE 3: SEARCH AND UTILITY OPERATIONS")
-    print("-" * 40)
-    
-    # Test global search
-    tester.test_global_search("Marion")
-    tester.test_global_search("Biographie")
-    tester.test_global_search("2007")
-    
-    # Test utility endpoints
-    tester.test_get_genres()
-    tester.test_get_nationalities()
-    
-    print("\n📤 PHASE 4: FILE UPLOAD OPERATIONS")
-    print("-" * 40)
-    
-    # Test file uploads
-    if actor1_id:
-        tester.test_file_upload("actor", actor1_id)
-    if movie1_id:
-        tester.test_file_upload("movie", movie1_id)
+    async with tester:
+        print("\n📋 PHASE 1: ACTOR CRUD OPERATIONS")
+        print("-" * 40)
+        
+        # Test creating actors
+        actor1_id, actor2_id = await asyncio.gather(
+            tester.test_create_actor(sample_actor),
+            tester.test_create_actor(sample_actor2)
+        )
+        
+        # Test getting all/specific actors, search and filters
+        await asyncio.gather(
+            tester.test_get_actors(),
+            *([tester.test_get_actor_by_id(actor1_id)] if actor1_id else []),
+            tester.test_get_actors({"search": "Marion"}),
+            tester.test_get_actors({"nationalite": "Française"}),
+            tester.test_get_actors({"age_min": 45, "age_max": 55})
+        )
+        
+        print("\n🎬 PHASE 2: MOVIE CRUD OPERATIONS")
+        print("-" * 40)
+        
+        # Test creating movies
+        movie1_id, movie2_id = await asyncio.gather(
+            tester.test_create_movie(sample_movie),
+            tester.test_create_movie(sample_movie2)
+        )
+        
+        # Test getting all/specific movies, search and filters
+        await asyncio.gather(
+            tester.test_get_movies(),
+            *([tester.test_get_movie_by_id(movie1_id)] if movie1_id else []),
+            tester.test_get_movies({"search": "Môme"}),
+            tester.test_get_movies({"genre": "Biographie"}),
+            tester.test_get_movies({"annee": 2007})
+        )
+        
+        print("\n🔍 PHASE 3: SEARCH AND UTILITY OPERATIONS")
+        print("-" * 40)
+        
+        # Test global search and utility endpoints
+        await asyncio.gather(
+            tester.test_global_search("Marion"),
+            tester.test_global_search("Biographie"),
+            tester.test_global_search("2007"),
+            tester.test_get_genres(),
+            tester.test_get_nationalities()
+        )
+        
+        print("\n📤 PHASE 4: FILE UPLOAD OPERATIONS")
+        print("-" * 40)
+        
+        # Test file uploads
+        uploads = []
+        if actor1_id:
+            uploads.append(tester.test_file_upload("actor", actor1_id))
+        if movie1_id:
+            uploads.append(tester.test_file_upload("movie", movie1_id))
+        await asyncio.gather(*uploads)
     
     print("\n📊 FINAL RESULTS")
     print("=" * 50)
@@ -323,4 +333,4 @@ def main():
         return 1
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
\ No newline at end of file